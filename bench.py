@@ -0,0 +1,877 @@
+"""Offline benchmark for the THOT fetch -> dedup -> buffer -> send pipeline.
+
+Runs main.py's real code against local stand-ins for every external service:
+an RSS generator, an in-memory Supabase/PostgREST server and a fake Telegram
+Bot API that enforces rate limits with 429s. Reports throughput, end-to-end
+latency percentiles and memory for N feeds x M entries x K subscribers.
+
+    python bench.py --feeds 20 --entries 10 --subscribers 50
+
+With --instances N (N > 1) it starts N separate main.py processes in
+COORDINATION_MODE=supabase against the same stand-ins, and reports how the
+work was split and whether any (chat, link) was delivered twice.
+
+--postgres runs any of this against real Postgres instead of the in-memory
+fake: schema.sql and coordination.sql are loaded as written and a thin
+PostgREST translation serves main.py's queries and RPCs from them ("auto"
+starts a throwaway server through pgserver; --supabase-url swaps the
+translation for a real Supabase stack). --gunicorn boots the production entry
+point, `gunicorn -c gunicorn.conf.py wsgi:app`, waits for /ready and the
+deliveries, then sends SIGTERM and reports how the workers shut down.
+
+    python bench.py --postgres auto --instances 3 --cycles 3
+    python bench.py --gunicorn --instances 3 --postgres auto
+"""
+import argparse
+import html
+import json
+import os
+import re
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+BENCH_TOKEN = "123456:BENCH"
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ------------------- FAKE SERVERS -------------------
+class QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Streaming parses hang up as soon as they have enough entries; that is expected
+        pass
+
+def serve(handler_class):
+    server = QuietServer(("127.0.0.1", 0), handler_class)
+    threading.Thread(target=server.serve_forever, daemon=True, name=handler_class.__name__).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+class QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status, body, content_type="application/json", headers=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def discard_body(self):
+        # postgrest-py sends "{}" with GET and DELETE; left unread it would corrupt the next keep-alive request
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+class RssGenerator(QuietHandler):
+    """Serves /feed/<n>; every poll publishes new_per_poll fresh entries on top"""
+
+    entries = 10
+    new_per_poll = 0
+    body_bytes = 0
+    latency = 0.0
+    polls = {}
+    lock = threading.Lock()
+    requests = 0
+    served = set()  # every link handed out, for the expected delivery count
+
+    def do_GET(self):
+        feed_id = int(self.path.rstrip("/").rsplit("/", 1)[-1])
+        with RssGenerator.lock:
+            poll = RssGenerator.polls.get(feed_id, 0)
+            RssGenerator.polls[feed_id] = poll + 1
+            RssGenerator.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        newest = poll * self.new_per_poll + self.entries
+        now = time.time()
+        padding = "x" * self.body_bytes
+        items = []
+        for n in range(newest, newest - self.entries, -1):
+            published = format_datetime(datetime.fromtimestamp(now - (newest - n) * 60, timezone.utc))
+            # Distinct word sets per story, so near-duplicate detection leaves them alone
+            items.append(
+                f"<item><title>Bench feed{feed_id} item{n} headline</title>"
+                f"<link>https://bench.example/{feed_id}/{n}</link>"
+                f"<guid>bench-{feed_id}-{n}</guid><pubDate>{published}</pubDate>"
+                f"<description>{padding}</description></item>"
+            )
+        with RssGenerator.lock:
+            RssGenerator.served.update(f"https://bench.example/{feed_id}/{n}"
+                                       for n in range(newest, newest - self.entries, -1))
+        body = (f'<?xml version="1.0"?><rss version="2.0"><channel><title>Bench {feed_id}</title>'
+                f'{"".join(items)}</channel></rss>')
+        self.send_body(200, body, "application/rss+xml")
+
+def parse_in_list(value):
+    """Split a PostgREST in.(...) list, honoring the double quotes postgrest-py adds"""
+    return [quoted or bare for quoted, bare in re.findall(r'"([^"]*)"|([^,]+)', value)]
+
+class FakePostgrest(QuietHandler):
+    """Just enough of PostgREST for main.py: eq/gt/lt/in filters, order, limit, exact count,
+    insert, upsert, update, delete and the coordination.sql RPCs"""
+
+    tables = {}
+    next_id = {}
+    lock = threading.Lock()
+    requests = 0
+
+    @staticmethod
+    def coerce(row_value, raw):
+        if isinstance(row_value, bool):
+            return raw.lower() == "true"
+        if isinstance(row_value, int):
+            return int(raw)
+        return raw
+
+    def query(self):
+        parts = urlsplit(self.path)
+        table = parts.path.rsplit("/", 1)[-1]
+        params = parse_qsl(parts.query, keep_blank_values=True)
+        return table, params
+
+    def matching(self, rows, params):
+        for column, expression in params:
+            if column in ("select", "order", "limit", "offset", "on_conflict", "columns"):
+                continue
+            op, _, raw = expression.partition(".")
+            raw = unquote(raw)
+            if op == "eq":
+                rows = [row for row in rows if row.get(column) is not None and row[column] == self.coerce(row[column], raw)]
+            elif op == "gt":
+                rows = [row for row in rows if row.get(column) is not None and row[column] > self.coerce(row[column], raw)]
+            elif op == "lt":
+                rows = [row for row in rows if row.get(column) is not None and row[column] < float(raw)]
+            elif op == "in":
+                wanted = set(parse_in_list(raw.strip("()")))
+                rows = [row for row in rows if str(row.get(column)) in wanted]
+        return rows
+
+    def do_GET(self):
+        self.discard_body()
+        table, params = self.query()
+        with FakePostgrest.lock:
+            FakePostgrest.requests += 1
+            rows = self.matching(list(self.tables.get(table, [])), params)
+        options = dict(params)
+        total = len(rows)
+        if "order" in options:
+            column = options["order"].split(".")[0]
+            rows.sort(key=lambda row: row.get(column))
+        if "limit" in options:
+            rows = rows[:int(options["limit"])]
+        if "select" in options and options["select"] != "*":
+            columns = options["select"].split(",")
+            rows = [{column: row.get(column) for column in columns} for row in rows]
+        headers = {}
+        if "count=exact" in (self.headers.get("Prefer") or ""):
+            headers["Content-Range"] = f"0-{max(len(rows) - 1, 0)}/{total}"
+        self.send_body(200, json.dumps(rows), headers=headers)
+
+    def do_POST(self):
+        table, params = self.query()
+        payload = self.read_json()
+        if "/rpc/" in self.path:
+            with FakePostgrest.lock:
+                FakePostgrest.requests += 1
+                result = getattr(self, f"rpc_{table}")(**payload)
+            self.send_body(200, json.dumps(result))
+            return
+        
+        rows = payload if isinstance(payload, list) else [payload]
+        conflict = [column for column in (dict(params).get("on_conflict") or "").split(",") if column]
+        ignore_duplicates = "ignore-duplicates" in (self.headers.get("Prefer") or "")
+        written = []
+        with FakePostgrest.lock:
+            FakePostgrest.requests += 1
+            stored = self.tables.setdefault(table, [])
+            for row in rows:
+                existing = next((r for r in stored if conflict
+                                 and all(r.get(column) == row.get(column) for column in conflict)), None)
+                if existing is not None:
+                    if not ignore_duplicates:
+                        existing.update(row)
+                        written.append(row)
+                    continue
+                FakePostgrest.next_id[table] = FakePostgrest.next_id.get(table, 0) + 1
+                stored.append(dict(row, id=FakePostgrest.next_id[table]))
+                written.append(row)
+        self.send_body(201, json.dumps(written))
+    
+    def do_DELETE(self):
+        self.discard_body()
+        table, params = self.query()
+        with FakePostgrest.lock:
+            FakePostgrest.requests += 1
+            doomed = self.matching(self.tables.get(table, []), params)
+            doomed_ids = {id(row) for row in doomed}
+            self.tables[table] = [row for row in self.tables.get(table, []) if id(row) not in doomed_ids]
+        self.send_body(200, json.dumps(doomed))
+    
+    # The RPCs run under the class lock, which stands in for the row locks in coordination.sql
+    def rpc_claim_outbox(self, p_owner, p_limit, p_lease_seconds, p_min_published):
+        now = time.time()
+        free = [row for row in self.tables.get("post_outbox", [])
+                if (row.get("owner") is None or row["lease_until"] < now)
+                and (row.get("available_at") is None or row["available_at"] <= now)
+                and row["published"] >= p_min_published]
+        free.sort(key=lambda row: -row["score"])
+        claimed = []
+        for row in free[:p_limit]:
+            claimed.append({"link": row["link"], "post": row["post"], "reclaimed": row.get("owner") is not None})
+            row.update(owner=p_owner, lease_until=now + p_lease_seconds)
+        return claimed
+    
+    def rpc_renew_outbox(self, p_owner, p_links, p_lease_seconds):
+        wanted = set(p_links)
+        for row in self.tables.get("post_outbox", []):
+            if row["link"] in wanted and row.get("owner") == p_owner:
+                row["lease_until"] = time.time() + p_lease_seconds
+        return None
+    
+    def rpc_check_stories(self, p_posts, p_threshold, p_window_seconds):
+        now = time.time()
+        stories = [row for row in self.tables.get("story_fingerprints", []) if now - row["created_at"] <= p_window_seconds]
+        self.tables["story_fingerprints"] = stories
+        results = []
+        for post in p_posts:
+            tokens, bands = set(post["tokens"]), set(post["bands"])
+            same = [row for row in stories if row["category"] == post["category"]]
+            duplicate_of = None
+            if not any(row["link"] == post["link"] for row in same):
+                duplicate_of = next((row["link"] for row in same if bands & set(row["bands"])
+                                     and len(tokens & set(row["tokens"])) / len(tokens | set(row["tokens"])) >= p_threshold), None)
+                if duplicate_of is None:
+                    stories.append(dict(post, created_at=now))
+            results.append({"link": post["link"], "duplicate_of": duplicate_of})
+        return results
+    
+    def rpc_acquire_leases(self, p_names, p_owner, p_lease_seconds):
+        now = time.time()
+        leases = self.tables.setdefault("leases", [])
+        by_name = {row["name"]: row for row in leases}
+        held = []
+        for name in dict.fromkeys(p_names):
+            row = by_name.get(name)
+            if row is None:
+                row = {"name": name}
+                leases.append(row)
+            elif row["owner"] != p_owner and row["lease_until"] >= now:
+                continue
+            row.update(owner=p_owner, lease_until=now + p_lease_seconds)
+            held.append({"name": name})
+        return held
+
+    def do_PATCH(self):
+        table, params = self.query()
+        changes = self.read_json()
+        with FakePostgrest.lock:
+            FakePostgrest.requests += 1
+            rows = self.matching(self.tables.get(table, []), params)
+            for row in rows:
+                row.update(changes)
+        self.send_body(200, json.dumps(rows))
+
+IDENTIFIER = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+def identifier(name):
+    if not IDENTIFIER.match(name):
+        raise ValueError(f"unsupported identifier {name!r}")
+    return f'"{name}"'
+
+class SqlPostgrest(QuietHandler):
+    """The same PostgREST subset as FakePostgrest, translated to SQL on a real Postgres.
+    
+    Tables and RPCs are the ones schema.sql and coordination.sql create, so the
+    claim/lease/fingerprint functions run as written, with real row locks.
+    Errors come back in PostgREST's shape, carrying the Postgres SQLSTATE.
+    """
+
+    pool = None  # psycopg2 ThreadedConnectionPool, set by use_postgres()
+    lock = threading.Lock()
+    requests = 0
+    reserved = ("select", "order", "limit", "offset", "on_conflict", "columns")
+    operators = {"eq": "=", "gt": ">", "lt": "<", "gte": ">=", "lte": "<=", "neq": "<>"}
+
+    def query(self):
+        parts = urlsplit(self.path)
+        return parts.path.rsplit("/", 1)[-1], parse_qsl(parts.query, keep_blank_values=True)
+
+    def where(self, params):
+        clauses, values = [], []
+        for column, expression in params:
+            if column in self.reserved:
+                continue
+            op, _, raw = expression.partition(".")
+            if op == "in":
+                clauses.append(f"{identifier(column)} in %s")
+                values.append(tuple(parse_in_list(raw[1:-1])) or (None,))
+            elif op in self.operators:
+                clauses.append(f"{identifier(column)} {self.operators[op]} %s")
+                values.append(raw)
+            else:
+                raise ValueError(f"unsupported filter {column}={expression}")
+        return (" where " + " and ".join(clauses) if clauses else ""), values
+
+    def execute(self, sql, values=()):
+        with SqlPostgrest.lock:
+            SqlPostgrest.requests += 1
+        conn = self.pool.getconn()
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql, values)
+                return cur.fetchone()[0] if cur.description else None
+        finally:
+            self.pool.putconn(conn)
+
+    def respond(self, status, build):
+        import psycopg2
+        try:
+            body, headers = build()
+        except psycopg2.Error as e:
+            code = {"23505": 409, "42P01": 404, "42883": 404}.get(e.pgcode, 400)
+            self.send_body(code, json.dumps({"code": e.pgcode, "message": (e.pgerror or str(e)).strip(),
+                                             "details": None, "hint": None}))
+            return
+        except ValueError as e:
+            self.send_body(400, json.dumps({"code": "PGRST100", "message": str(e), "details": None, "hint": None}))
+            return
+        self.send_body(status, json.dumps(body), headers=headers)
+
+    def do_GET(self):
+        self.discard_body()
+
+        def build():
+            table, params = self.query()
+            options = dict(params)
+            where, values = self.where(params)
+            columns = options.get("select", "*")
+            columns = "*" if columns == "*" else ", ".join(identifier(column) for column in columns.split(","))
+            sql = f"select {columns} from {identifier(table)}{where}"
+            if "order" in options:
+                terms = []
+                for term in options["order"].split(","):
+                    column, *modifiers = term.split(".")
+                    terms.append(" ".join([identifier(column)] + [{"asc": "asc", "desc": "desc", "nullsfirst": "nulls first",
+                                                                   "nullslast": "nulls last"}[m] for m in modifiers]))
+                sql += " order by " + ", ".join(terms)
+            if "limit" in options:
+                sql += f" limit {int(options['limit'])}"
+            rows = self.execute(f"select coalesce(json_agg(t), '[]') from ({sql}) t", values)
+            headers = {}
+            if "count=exact" in (self.headers.get("Prefer") or ""):
+                total = self.execute(f"select count(*) from {identifier(table)}{where}", values)
+                headers["Content-Range"] = f"0-{max(len(rows) - 1, 0)}/{total}"
+            return rows, headers
+        self.respond(200, build)
+
+    def do_POST(self):
+        from psycopg2.extras import Json
+        table, params = self.query()
+        payload = self.read_json()
+        if "/rpc/" in self.path:
+            def build():
+                names = list(payload)
+                args = ", ".join(f"{identifier(name)} => %s" for name in names)
+                values = [Json(value) if isinstance(value, dict) or (isinstance(value, list) and value
+                                                                    and isinstance(value[0], dict)) else value
+                          for value in payload.values()]
+                returns_set = self.execute("select bool_or(proretset) from pg_proc where proname = %s", (table,))
+                if returns_set:
+                    return self.execute(f"select coalesce(json_agg(r), '[]') from (select * from {identifier(table)}({args})) r", values), {}
+                self.execute(f"select {identifier(table)}({args})::text", values)
+                return None, {}
+            self.respond(200, build)
+            return
+
+        def build():
+            rows = payload if isinstance(payload, list) else [payload]
+            if not rows:
+                return [], {}
+            columns = list(dict.fromkeys(column for row in rows for column in row))
+            column_list = ", ".join(identifier(column) for column in columns)
+            sql = (f"insert into {identifier(table)} ({column_list}) select {column_list} "
+                   f"from jsonb_populate_recordset(null::{identifier(table)}, %s::jsonb)")
+            conflict = [column for column in (dict(params).get("on_conflict") or "").split(",") if column]
+            if conflict:
+                sql += f" on conflict ({', '.join(identifier(column) for column in conflict)})"
+                updates = [column for column in columns if column not in conflict]
+                if "ignore-duplicates" in (self.headers.get("Prefer") or "") or not updates:
+                    sql += " do nothing"
+                else:
+                    sql += " do update set " + ", ".join(f"{identifier(c)} = excluded.{identifier(c)}" for c in updates)
+            sql = f"with written as ({sql} returning *) select coalesce(json_agg(written), '[]') from written"
+            return self.execute(sql, [json.dumps(rows)]), {}
+        self.respond(201, build)
+
+    def do_PATCH(self):
+        def build():
+            table, params = self.query()
+            changes = self.read_json()
+            where, values = self.where(params)
+            column_list = ", ".join(identifier(column) for column in changes)
+            sql = (f"with changed as (update {identifier(table)} set ({column_list}) = "
+                   f"(select {column_list} from jsonb_populate_record(null::{identifier(table)}, %s::jsonb)){where} "
+                   f"returning *) select coalesce(json_agg(changed), '[]') from changed")
+            return self.execute(sql, [json.dumps(changes)] + values), {}
+        self.respond(200, build)
+
+    def do_DELETE(self):
+        self.discard_body()
+
+        def build():
+            table, params = self.query()
+            where, values = self.where(params)
+            sql = (f"with doomed as (delete from {identifier(table)}{where} returning *) "
+                   f"select coalesce(json_agg(doomed), '[]') from doomed")
+            return self.execute(sql, values), {}
+        self.respond(200, build)
+
+def use_postgres(spec):
+    """Connect to the Postgres in spec ("auto" starts a throwaway pgserver) and load the THOT schema.
+    
+    Every THOT table in that database is emptied first, so point it at a scratch database.
+    """
+    try:
+        import psycopg2
+        import psycopg2.pool
+    except ImportError:
+        sys.exit("--postgres needs psycopg2 (pip install psycopg2-binary)")
+    if spec == "auto":
+        try:
+            import pgserver
+        except ImportError:
+            sys.exit("--postgres auto needs pgserver (pip install pgserver), or pass a DSN")
+        spec = pgserver.get_server(tempfile.mkdtemp(prefix="thot-bench-pg-"), cleanup_mode="delete").get_uri()
+    conn = psycopg2.connect(spec)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        for script in ("schema.sql", "coordination.sql"):
+            with open(os.path.join(BENCH_DIR, script)) as f:
+                cur.execute(f.read())
+        cur.execute("truncate sent_posts, subscribers, post_outbox, leases, story_fingerprints restart identity")
+    conn.close()
+    SqlPostgrest.pool = psycopg2.pool.ThreadedConnectionPool(1, 64, spec, options="-c statement_timeout=30000")
+    return spec
+
+def seed_subscribers(chat_ids):
+    rows = [{"chat_id": chat_id, "categories": None, "active": True} for chat_id in chat_ids]
+    if SqlPostgrest.pool is not None:
+        conn = SqlPostgrest.pool.getconn()
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("insert into subscribers (chat_id, categories, active) "
+                            "select chat_id, categories, active from jsonb_populate_recordset(null::subscribers, %s::jsonb)",
+                            (json.dumps(rows),))
+        finally:
+            SqlPostgrest.pool.putconn(conn)
+    else:
+        FakePostgrest.tables["subscribers"] = [dict(row, id=n + 1) for n, row in enumerate(rows)]
+
+class FakeTelegram(QuietHandler):
+    """sendMessage endpoint that answers 429 + retry_after when per-chat or global limits are exceeded"""
+
+    chat_rate = 1.0
+    global_rate = 30.0
+    latency = 0.0
+    lock = threading.Lock()
+    chat_sends = {}    # chat_id -> recent send times
+    global_sends = []
+    received = []      # (time, chat_id, link), one per link in a message
+    messages = 0
+    throttled = 0
+    webhook_url = ""
+
+    def do_GET(self):
+        self.do_POST()
+
+    def do_POST(self):
+        method = urlsplit(self.path).path.rsplit("/", 1)[-1]
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length).decode("utf-8")
+        if "json" in (self.headers.get("Content-Type") or ""):
+            fields = json.loads(raw or "{}")
+        else:
+            fields = dict(parse_qsl(raw))
+        fields.update(parse_qsl(urlsplit(self.path).query))
+        if self.latency:
+            time.sleep(self.latency)
+
+        if method == "setWebhook":
+            FakeTelegram.webhook_url = fields.get("url", "")
+        if method == "getWebhookInfo":
+            info = {"url": FakeTelegram.webhook_url, "has_custom_certificate": False, "pending_update_count": 0}
+            self.send_body(200, json.dumps({"ok": True, "result": info}))
+            return
+        if method != "sendMessage":
+            self.send_body(200, json.dumps({"ok": True, "result": True}))
+            return
+
+        chat_id = int(fields["chat_id"])
+        now = time.monotonic()
+        with FakeTelegram.lock:
+            recent = [t for t in self.chat_sends.get(chat_id, []) if now - t < 1]
+            FakeTelegram.global_sends = [t for t in FakeTelegram.global_sends if now - t < 1]
+            # Allow a little slack over the nominal rate, as Telegram does
+            if len(recent) >= max(self.chat_rate * 1.2, 1) or len(FakeTelegram.global_sends) >= self.global_rate * 1.2:
+                FakeTelegram.throttled += 1
+                self.send_body(429, json.dumps({
+                    "ok": False, "error_code": 429,
+                    "description": "Too Many Requests: retry after 1",
+                    "parameters": {"retry_after": 1}
+                }))
+                return
+            recent.append(now)
+            self.chat_sends[chat_id] = recent
+            FakeTelegram.global_sends.append(now)
+            FakeTelegram.messages += 1
+            at = time.time()
+            # Single posts and digests both put each link on a line of its own
+            FakeTelegram.received.extend((at, chat_id, html.unescape(line)) for line in fields.get("text", "").split("\n")
+                                         if line.startswith("http"))
+
+        self.send_body(200, json.dumps({"ok": True, "result": {
+            "message_id": FakeTelegram.messages, "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"}, "text": fields.get("text", "")
+        }}))
+
+# ------------------- BENCHMARK -------------------
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def supabase_requests(backend):
+    return backend.requests if backend is not None else "n/a"
+
+def backend_name(args):
+    if args.supabase_url:
+        return f"Supabase at {args.supabase_url}"
+    return "Postgres" if args.postgres else "in-memory fake"
+
+def run(args):
+    RssGenerator.entries = args.entries
+    RssGenerator.new_per_poll = args.new_per_poll
+    RssGenerator.body_bytes = args.body_bytes
+    RssGenerator.latency = args.feed_latency / 1000
+    FakeTelegram.chat_rate = args.chat_rate
+    FakeTelegram.global_rate = args.global_rate
+    FakeTelegram.latency = args.telegram_latency / 1000
+
+    _, rss_url = serve(RssGenerator)
+    _, telegram_url = serve(FakeTelegram)
+    # Supabase: the in-memory fake, real Postgres behind the SQL translation, or a real Supabase stack
+    backend = FakePostgrest
+    if args.postgres:
+        use_postgres(args.postgres)
+        backend = None if args.supabase_url else SqlPostgrest
+    postgrest_url = args.supabase_url or serve(backend)[1]
+
+    # Everything main.py persists lands in a scratch directory
+    workdir = tempfile.mkdtemp(prefix="thot-bench-")
+    os.chdir(workdir)
+    with open("feeds.json", "w") as f:
+        json.dump({
+            "categories": {"Bench": {"weight": 1}},
+            "feeds": [{"url": f"{rss_url}/feed/{n}", "category": "Bench", "limit": args.entries}
+                      for n in range(args.feeds)]
+        }, f)
+
+    subscriber_ids = [1000 + n for n in range(args.subscribers)]
+    seed_subscribers(subscriber_ids[1:])
+
+    os.environ.update({
+        "SUPABASE_URL": postgrest_url,
+        "SUPABASE_KEY": args.supabase_key,
+        "TELEGRAM_TOKEN": BENCH_TOKEN,
+        "USER_CHAT_ID": str(subscriber_ids[0]),
+        "FEEDS_CONFIG_FILE": os.path.join(workdir, "feeds.json"),
+        "TELEGRAM_CHAT_RATE": str(args.chat_rate),
+        "TELEGRAM_GLOBAL_RATE": str(args.global_rate),
+        "FETCH_MAX_WORKERS": str(args.fetch_workers),
+        "SEND_WORKERS": str(args.send_workers),
+        "DIGEST_MODE": args.digest,
+        "BENCH_TELEGRAM_URL": telegram_url
+    })
+    if args.gunicorn:
+        return run_gunicorn(args, workdir, len(subscriber_ids), backend)
+    if args.instances > 1:
+        return run_instances(args, len(subscriber_ids), backend)
+    sys.path.insert(0, BENCH_DIR)
+
+    tracemalloc.start()
+    import main
+    import telebot.apihelper
+    telebot.apihelper.API_URL = telegram_url + "/bot{0}/{1}"
+
+    main.feed_cache.ttl = 0  # every cycle should really hit the RSS server
+    main.seen_index.warm()
+    main.subscribers.refresh(force=True)
+
+    sender = threading.Thread(target=main.send_batch, daemon=True, name="Sender")
+    sender.start()
+
+    started = time.time()
+    cycle_times = []
+    queued_at = {}
+    expected = set()
+    for _ in range(args.cycles):
+        cycle_started = time.time()
+        posts = main.fetch_rss_posts()
+        cycle_times.append(time.time() - cycle_started)
+        for post in posts:
+            queued_at.setdefault(post["link"], cycle_started)
+            expected.update((chat_id, post["link"]) for chat_id in post["chats"])
+        main.semi_fetch_buffer.extend(posts)
+
+    deadline = time.time() + args.timeout
+    while len(FakeTelegram.received) < len(expected) and time.time() < deadline:
+        time.sleep(0.05)
+    finished = time.time()
+    main.shutdown_event.set()
+
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    pools = main.http_pool_stats().values()
+    http_requests = sum(entry["requests"] for entry in pools)
+    http_connections = sum(entry["connections"] for entry in pools)
+
+    latencies = [at - queued_at[link] for at, _, link in FakeTelegram.received if link in queued_at]
+    delivered = len(FakeTelegram.received)
+    elapsed = finished - started
+    report = [
+        f"THOT pipeline benchmark — {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"Shape: {args.feeds} feeds x {args.entries} entries x {args.subscribers} subscribers, "
+        f"{args.cycles} cycle(s), feed latency {args.feed_latency}ms, body padding {args.body_bytes}B",
+        f"Deliveries: {delivered}/{len(expected)} in {elapsed:.2f}s ({delivered / elapsed if elapsed else 0:.1f}/s)",
+        f"Fetch cycle: mean {sum(cycle_times) / len(cycle_times):.3f}s, max {max(cycle_times):.3f}s",
+        f"End-to-end latency: p50 {percentile(latencies, 50):.2f}s, p90 {percentile(latencies, 90):.2f}s, "
+        f"p99 {percentile(latencies, 99):.2f}s, max {max(latencies, default=0):.2f}s",
+        f"Telegram: {FakeTelegram.messages} sendMessage calls, {FakeTelegram.throttled} 429s "
+        f"(digest mode {args.digest})",
+        f"Requests: {RssGenerator.requests} feed, {supabase_requests(backend)} Supabase ({backend_name(args)})",
+        f"Pooled HTTP: {http_requests} requests over {http_connections} connections",
+        f"Memory: traced peak {peak_traced / 1048576:.1f}MB, "
+        f"process max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f}MB"
+    ]
+    return "\n".join(report)
+
+def run_instance(args):
+    """One coordinated main.py process; fetches its cycles, then sends until stdin closes"""
+    os.chdir(tempfile.mkdtemp(prefix="thot-bench-instance-"))
+    sys.path.insert(0, BENCH_DIR)
+    import main
+    import telebot.apihelper
+    telebot.apihelper.API_URL = os.environ["BENCH_TELEGRAM_URL"] + "/bot{0}/{1}"
+
+    main.feed_cache.ttl = 0
+    main.seen_index.warm()
+    main.subscribers.refresh(force=True)
+    sender = threading.Thread(target=main.send_batch, daemon=True, name="Sender")
+    sender.start()
+
+    for _ in range(args.cycles):
+        main.semi_fetch_buffer.extend(main.fetch_rss_posts())
+    print("BENCH " + json.dumps({"cycles_done": True}), flush=True)
+
+    sys.stdin.read()  # the parent closes stdin once every delivery has arrived
+    main.shutdown_event.set()
+    sender.join(10)
+
+    def total(metric, label):
+        return sum(value for (name, labels), value in main.metrics.values.items() if name == metric and label in labels)
+    print("BENCH " + json.dumps({
+        "instance": main.INSTANCE_ID,
+        "feeds_fetched": total("thot_feed_fetch_total", ("status", "fetched")),
+        "messages": total("thot_telegram_send_total", ("result", "ok"))
+    }), flush=True)
+
+def run_instances(args, subscriber_count, backend):
+    """Run several main.py processes in COORDINATION_MODE=supabase against the shared stand-ins"""
+    env = dict(os.environ, COORDINATION_MODE="supabase")
+    procs = []
+    for _ in range(args.instances):
+        proc = subprocess.Popen(
+            [sys.executable, os.path.join(BENCH_DIR, "bench.py"), *sys.argv[1:], "--instance"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=env
+        )
+        proc.reports = []
+        threading.Thread(target=lambda proc=proc: proc.reports.extend(
+            json.loads(line[6:]) for line in proc.stdout if line.startswith("BENCH ")
+        ), daemon=True).start()
+        procs.append(proc)
+
+    started = time.time()
+    deadline = started + args.timeout
+    while time.time() < deadline and not all(proc.reports for proc in procs):
+        time.sleep(0.05)
+    expected = len(RssGenerator.served) * subscriber_count
+    while time.time() < deadline and len({(chat, link) for _, chat, link in FakeTelegram.received}) < expected:
+        time.sleep(0.05)
+    finished = time.time()
+    time.sleep(1)  # let any late duplicate show up before counting
+
+    for proc in procs:
+        proc.stdin.close()
+    for proc in procs:
+        proc.wait(timeout=30)
+    time.sleep(0.1)
+
+    received = [(chat, link) for _, chat, link in FakeTelegram.received]
+    unique = set(received)
+    elapsed = finished - started
+    report = [
+        f"THOT multi-instance benchmark — {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"Shape: {args.instances} instances, {args.feeds} feeds x {args.entries} entries x {subscriber_count} "
+        f"subscribers, {args.cycles} cycle(s), digest mode {args.digest}",
+        f"Deliveries: {len(unique)}/{expected} unique in {elapsed:.2f}s, {len(received) - len(unique)} duplicate(s)",
+        f"Telegram: {FakeTelegram.messages} sendMessage calls, {FakeTelegram.throttled} 429s",
+        f"Requests: {RssGenerator.requests} feed, {supabase_requests(backend)} Supabase ({backend_name(args)})"
+    ]
+    for proc in procs:
+        stats = proc.reports[-1] if len(proc.reports) > 1 else {}
+        report.append(f"  {stats.get('instance', 'instance ?')}: {stats.get('feeds_fetched', 0):.0f} feed fetches, "
+                      f"{stats.get('messages', 0):.0f} messages sent")
+    return "\n".join(report)
+
+def run_gunicorn(args, workdir, subscriber_count, backend):
+    """Boot the production entry point under gunicorn against the stand-ins, deliver, then SIGTERM it"""
+    # telebot keeps its API URL in a module global; a sitecustomize on the workers' path points it at the fake
+    with open(os.path.join(workdir, "sitecustomize.py"), "w") as f:
+        f.write("import os\nimport telebot.apihelper\n"
+                "telebot.apihelper.API_URL = os.environ['BENCH_TELEGRAM_URL'] + '/bot{0}/{1}'\n")
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(args.instances), WEBHOOK_URL=f"http://127.0.0.1:{port}",
+               PYTHONPATH=os.pathsep.join([workdir, BENCH_DIR]))
+    if args.instances > 1:
+        env["COORDINATION_MODE"] = "supabase"
+    log_path = os.path.join(workdir, "gunicorn.log")
+    with open(log_path, "w") as log:
+        proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", os.path.join(BENCH_DIR, "gunicorn.conf.py"),
+                                 "wsgi:app"], cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    def get(path):
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=2) as response:
+                return response.status
+        except (OSError, urllib.error.HTTPError):
+            return None
+
+    def delivered():
+        return {(chat, link) for _, chat, link in FakeTelegram.received if link in RssGenerator.served}
+
+    started = time.time()
+    deadline = started + args.timeout
+    while time.time() < deadline and proc.poll() is None and get("/ready") != 200:
+        time.sleep(0.2)
+    ready_after = time.time() - started
+    ready = get("/ready") == 200
+    # Wait for the first poll of every feed and for all of it to be delivered
+    while time.time() < deadline and proc.poll() is None and (
+            len(RssGenerator.served) < args.feeds * args.entries
+            or len(delivered()) < len(RssGenerator.served) * subscriber_count):
+        time.sleep(0.1)
+    expected = len(RssGenerator.served) * subscriber_count
+    unique = delivered()
+    received = [(chat, link) for _, chat, link in FakeTelegram.received if link in RssGenerator.served]
+
+    early_exit = proc.poll()
+    stopping = time.time()
+    if early_exit is None:
+        proc.send_signal(signal.SIGTERM)
+    try:
+        code = proc.wait(timeout=float(os.environ.get("SHUTDOWN_DEADLINE", "20")) + 15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        code = "killed after the timeout"
+    stopped_after = time.time() - stopping
+    with open(log_path) as log:
+        output = log.read()
+
+    report = [
+        f"THOT gunicorn check — {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"Command: gunicorn -c gunicorn.conf.py wsgi:app, {args.instances} worker(s), "
+        f"coordination {env.get('COORDINATION_MODE', 'local')}, Supabase: {backend_name(args)}",
+        f"Ready: {'yes' if ready else 'NO'} after {ready_after:.1f}s",
+        f"Deliveries: {len(unique)}/{expected} unique, {len(received) - len(unique)} duplicate(s)",
+        f"SIGTERM: " + (f"exited early with {early_exit}" if early_exit is not None else
+                        f"exit code {code} after {stopped_after:.1f}s, "
+                        f"{output.count('[Shutdown] Done')} of {args.instances} worker(s) drained"),
+        f"Requests: {RssGenerator.requests} feed, {supabase_requests(backend)} Supabase",
+        f"Log: {log_path}"
+    ]
+    return "\n".join(report)
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--feeds", type=int, default=20, help="number of generated feeds (N)")
+    parser.add_argument("--entries", type=int, default=10, help="entries per feed (M)")
+    parser.add_argument("--subscribers", type=int, default=10, help="subscriber chats (K)")
+    parser.add_argument("--cycles", type=int, default=1, help="fetch cycles to run")
+    parser.add_argument("--new-per-poll", type=int, default=2, help="fresh entries each feed publishes per poll")
+    parser.add_argument("--feed-latency", type=float, default=50, help="RSS server response delay (ms)")
+    parser.add_argument("--body-bytes", type=int, default=2000, help="description padding per entry (bytes)")
+    parser.add_argument("--telegram-latency", type=float, default=5, help="fake Telegram response delay (ms)")
+    parser.add_argument("--chat-rate", type=float, default=20, help="messages/second allowed per chat")
+    parser.add_argument("--global-rate", type=float, default=200, help="messages/second allowed overall")
+    parser.add_argument("--digest", choices=["off", "on", "auto"], default="auto", help="sender digest mode")
+    parser.add_argument("--fetch-workers", type=int, default=8)
+    parser.add_argument("--send-workers", type=int, default=16)
+    parser.add_argument("--instances", type=int, default=1, help="coordinated main.py processes (shared outbox mode)")
+    parser.add_argument("--instance", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--postgres", metavar="DSN",
+                        help='run against real Postgres: a DSN of a scratch database (its THOT tables are emptied), '
+                             'or "auto" for a throwaway pgserver; schema.sql and coordination.sql are loaded into it')
+    parser.add_argument("--supabase-url", help="with --postgres, talk to this Supabase/PostgREST stack "
+                                               "(e.g. `supabase start`) serving that database instead of the SQL translation")
+    parser.add_argument("--supabase-key", default="bench", help="API key for --supabase-url")
+    parser.add_argument("--gunicorn", action="store_true",
+                        help="boot `gunicorn -c gunicorn.conf.py wsgi:app` (--instances workers), "
+                             "wait for /ready and the deliveries, then SIGTERM it and report the shutdown")
+    parser.add_argument("--timeout", type=float, default=300, help="give up waiting for deliveries after this (s)")
+    parser.add_argument("--output", help="also append the report to this file (e.g. bench_output.txt)")
+    args = parser.parse_args()
+    if args.supabase_url and not args.postgres:
+        parser.error("--supabase-url needs --postgres pointing at the same database, to load the schema and seed it")
+    if args.instance:
+        run_instance(args)
+        return
+
+    output = os.path.abspath(args.output) if args.output else None
+    report = run(args)
+    print(report)
+    if output:
+        with open(output, "a") as f:
+            f.write(report + "\n\n")
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,138 @@
+-- Multi-instance coordination for THOT (COORDINATION_MODE=supabase).
+-- Run once in the Supabase SQL editor after schema.sql, which every mode needs.
+
+-- Shared send queue: one row per link, claimed by senders under a lease
+create table if not exists post_outbox (
+    link        text primary key,
+    post        jsonb not null,              -- the buffered post, including its pending chats
+    score       double precision not null,   -- publish time boosted by category weight
+    published   double precision not null,   -- epoch seconds, for age-based pruning
+    owner       text,                        -- instance holding the lease, null while queued
+    lease_until timestamptz,
+    available_at double precision,           -- epoch seconds; a failed send is not retried before this
+    created_at  timestamptz not null default now()
+);
+create index if not exists post_outbox_score_idx on post_outbox (score desc);
+create index if not exists post_outbox_published_idx on post_outbox (published);
+alter table post_outbox add column if not exists available_at double precision;
+
+-- Named leases: "feed:<url>" splits feeds between instances, "status", "announce"
+-- and "restart" make those once-per-service actions happen on one instance only
+create table if not exists leases (
+    name        text primary key,
+    owner       text not null,
+    lease_until timestamptz not null
+);
+
+-- Claim up to p_limit unleased (or expired) rows, best score first. SKIP LOCKED
+-- lets concurrent senders pass over rows another transaction is claiming.
+-- reclaimed is true when the row's previous lease expired, i.e. its sender died.
+-- Rows requeued after a failed send wait until available_at.
+create or replace function claim_outbox(
+    p_owner text, p_limit int, p_lease_seconds int, p_min_published double precision
+)
+returns table (link text, post jsonb, reclaimed boolean)
+language sql
+as $$
+    with picked as (
+        select o.link, o.owner is not null as reclaimed
+        from post_outbox o
+        where (o.owner is null or o.lease_until < now())
+          and (o.available_at is null or o.available_at <= extract(epoch from now()))
+          and o.published >= p_min_published
+        order by o.score desc
+        limit p_limit
+        for update skip locked
+    )
+    update post_outbox o
+    set owner = p_owner,
+        lease_until = now() + make_interval(secs => p_lease_seconds)
+    from picked
+    where o.link = picked.link
+    returning o.link, o.post, picked.reclaimed;
+$$;
+
+-- Extend the lease on rows p_owner still holds, so a sender that is still
+-- working on a batch (digest window, long fan-out) keeps it from being reclaimed.
+create or replace function renew_outbox(p_owner text, p_links text[], p_lease_seconds int)
+returns void
+language sql
+as $$
+    update post_outbox
+    set lease_until = now() + make_interval(secs => p_lease_seconds)
+    where link = any(p_links) and owner = p_owner;
+$$;
+
+-- Take or renew each named lease that is free, expired or already ours, and
+-- return the names p_owner holds afterwards. ON CONFLICT locks the contended
+-- rows, so two instances racing for the same name cannot both win.
+create or replace function acquire_leases(p_names text[], p_owner text, p_lease_seconds int)
+returns table (name text)
+language sql
+as $$
+    insert into leases as l (name, owner, lease_until)
+    select distinct unnest(p_names), p_owner, now() + make_interval(secs => p_lease_seconds)
+    on conflict (name) do update
+        set owner = excluded.owner, lease_until = excluded.lease_until
+        where l.owner = excluded.owner or l.lease_until < now()
+    returning l.name;
+$$;
+
+-- Headline fingerprints for near-duplicate suppression, shared so that a story
+-- fetched by one instance suppresses its look-alikes on every other one.
+-- bands are the MinHash LSH band keys; tokens the headline's significant words.
+create table if not exists story_fingerprints (
+    category   text not null,
+    link       text not null,
+    tokens     text[] not null,
+    bands      text[] not null,
+    created_at timestamptz not null default now(),
+    primary key (category, link)
+);
+create index if not exists story_fingerprints_bands_idx on story_fingerprints using gin (bands);
+create index if not exists story_fingerprints_created_idx on story_fingerprints (created_at);
+
+-- Check p_posts ([{link, category, tokens, bands}], earliest first) against the
+-- fingerprints of the last p_window_seconds. Returns each link with the earlier
+-- look-alike it repeats (word-set Jaccard >= p_threshold), or null after
+-- recording it. A link already recorded is never its own duplicate. The
+-- per-category advisory locks, taken in a fixed order, keep two instances from
+-- both recording look-alikes at the same time.
+create or replace function check_stories(p_posts jsonb, p_threshold double precision, p_window_seconds int)
+returns table (link text, duplicate_of text)
+language plpgsql
+as $$
+declare
+    item jsonb;
+    v_tokens text[];
+    v_bands text[];
+begin
+    perform pg_advisory_xact_lock(hashtext('story:' || c.category))
+    from (select distinct e->>'category' as category from jsonb_array_elements(p_posts) e order by 1) c;
+    
+    delete from story_fingerprints f where f.created_at < now() - make_interval(secs => p_window_seconds);
+    
+    for item in select * from jsonb_array_elements(p_posts) loop
+        v_tokens := array(select jsonb_array_elements_text(item->'tokens'));
+        v_bands := array(select jsonb_array_elements_text(item->'bands'));
+        link := item->>'link';
+        duplicate_of := null;
+        if not exists (select 1 from story_fingerprints f
+                       where f.category = item->>'category' and f.link = item->>'link') then
+            select f.link into duplicate_of
+            from story_fingerprints f
+            where f.category = item->>'category'
+              and f.bands && v_bands
+              and cardinality(array(select unnest(f.tokens) intersect select unnest(v_tokens)))::double precision
+                  / cardinality(array(select unnest(f.tokens) union select unnest(v_tokens))) >= p_threshold
+            order by f.created_at
+            limit 1;
+            if duplicate_of is null then
+                insert into story_fingerprints (category, link, tokens, bands)
+                values (item->>'category', item->>'link', v_tokens, v_bands);
+            end if;
+        end if;
+        return next;
+    end loop;
+end;
+$$;
@@ -0,0 +1,22 @@
+"""gunicorn settings for the THOT webhook server.
+
+Each worker imports main.py itself (no preload), so its background threads,
+pools and executors are its own. More than one worker only makes sense with
+COORDINATION_MODE=supabase; in local mode every worker would fetch and send
+the same posts, so the worker count is pinned to 1.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+shared = os.environ.get("COORDINATION_MODE", "local") == "supabase"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2")) if shared else 1
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", "8"))  # the webhook only enqueues, so requests are short
+preload_app = False
+timeout = 60
+# Leave room for main.lifecycle's drain (SHUTDOWN_DEADLINE) before gunicorn kills the worker
+graceful_timeout = int(float(os.environ.get("SHUTDOWN_DEADLINE", "20"))) + 5
+
+def worker_exit(server, worker):
+    import main
+    main.lifecycle.shutdown()
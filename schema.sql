@@ -0,0 +1,27 @@
+-- Tables every THOT deployment needs, in both COORDINATION_MODE=local and supabase.
+-- Required: run in the Supabase SQL editor before deploying. Safe to re-run.
+-- Multi-instance mode additionally needs coordination.sql.
+
+-- One row per (chat, link) delivered; also the source of the local seen-URL index
+create table if not exists sent_posts (
+    id         bigserial primary key,
+    chat_id    bigint not null,
+    url        text not null,
+    created_at timestamptz not null default now()
+);
+
+-- Chats that receive posts
+create table if not exists subscribers (
+    id         bigserial primary key,
+    chat_id    bigint not null unique,
+    categories text[],                       -- null = every category
+    active     boolean not null default true
+);
+
+-- sent_posts writes are upserts on (chat_id, url) that ignore duplicates, so a
+-- retried write never records a delivery twice. Without this index PostgREST
+-- rejects them (42P10) and the bot falls back to plain inserts with a warning.
+-- Drop existing duplicates first.
+delete from sent_posts a using sent_posts b
+ where a.chat_id = b.chat_id and a.url = b.url and a.id > b.id;
+create unique index if not exists sent_posts_chat_url_key on sent_posts (chat_id, url);
@@ -0,0 +1,5 @@
+"""WSGI entry point for running THOT under gunicorn: gunicorn -c gunicorn.conf.py wsgi:app"""
+import main
+
+main.start_service()
+app = main.app